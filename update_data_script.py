@@ -1,20 +1,107 @@
 from urllib.parse import urljoin
-import pandas as pd
-import json
+import asyncio
+import httpx
+import csv
+import xml.etree.ElementTree as ET
+from io import BytesIO
+import orjson
 import requests
-from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from lxml import html
 import re
 import sys
-from datetime import datetime
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
 import time
+import random
+import atexit
+import sqlite3
 from pathlib import Path
 
+# CSV values treated as missing (same defaults as pandas)
+NA_VALUES = {
+    "", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan", "1.#IND", "1.#QNAN",
+    "<NA>", "N/A", "NA", "NULL", "NaN", "None", "n/a", "nan", "null"
+}
+
+# bondID parameter in the yield table links
+BOND_ID_RE = re.compile(r'bondID=(\d+)')
+
+# Maximum number of issue price requests in flight at the same time
+STEP3_CONCURRENCY = 16
+
+# Issue price requests sent per second, halved each time the server answers 429
+STEP3_RATE_LIMIT = 8
+STEP3_MIN_RATE_LIMIT = 0.5
+
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+}
+
+# Shared session so the connection to STFI is kept alive between requests
+SESSION = requests.Session()
+SESSION.headers.update(HEADERS)
+SESSION.mount("https://", HTTPAdapter(pool_connections=1, max_retries=Retry(total=0)))
+atexit.register(SESSION.close)
+
+# Issue prices are static, so they are cached on disk across runs.
+# Missing prices are cached too, but only for a while since STFI may add them later.
+ISSUE_PRICE_CACHE_PATH = "issueprice_cache.sqlite"
+MISSING_PRICE_CACHE_TTL = 7 * 24 * 60 * 60  # seconds
+
+# Issue price tag in the bond definition XML, parsing is only needed when this doesn't match
+ISSUE_PRICE_RE = re.compile(rb"<issueprice(?:\s[^>]*)?>\s*([^<\s][^<]*?)\s*</issueprice>")
+
+# ETag/Last-Modified of previously downloaded files, used to skip unchanged downloads
+HTTP_VALIDATORS_PATH = "http_validators.json"
+
 def log_message(step, message, status="INFO"):
     """Helper function for consistent logging"""
     timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     print(f"[{timestamp}] [{status}] STEP {step}: {message}")
 
-def step0_download_stfi_csv():
+def load_http_validators(file_path):
+    """
+    Load the URL -> {etag, last_modified} dictionary, empty if not present
+    """
+    try:
+        with open(file_path, 'rb') as f:
+            return orjson.loads(f.read())
+    except (FileNotFoundError, orjson.JSONDecodeError):
+        return {}
+
+def save_http_validators(file_path, http_validators):
+    """
+    Save the URL -> {etag, last_modified} dictionary
+    """
+    with open(file_path, 'wb') as f:
+        f.write(orjson.dumps(http_validators))
+
+def conditional_headers(http_validators, url):
+    """
+    Build If-None-Match/If-Modified-Since headers from the validators stored for a URL
+    """
+    validators = http_validators.get(url, {})
+    headers = {}
+    if validators.get('etag'):
+        headers['If-None-Match'] = validators['etag']
+    if validators.get('last_modified'):
+        headers['If-Modified-Since'] = validators['last_modified']
+    return headers
+
+def remember_http_validators(http_validators, url, response_headers):
+    """
+    Store the ETag/Last-Modified of a response for the next conditional request
+    """
+    etag = response_headers.get('ETag')
+    last_modified = response_headers.get('Last-Modified')
+    if etag or last_modified:
+        http_validators[url] = {'etag': etag, 'last_modified': last_modified}
+    else:
+        http_validators.pop(url, None)
+
+def step0_download_stfi_csv(csv_file_path, http_validators):
     """
     STEP 0: Download CSV file from SimpletoolsForInvestors
     """
@@ -22,32 +109,38 @@ def step0_download_stfi_csv():
     
     url = "https://www.simpletoolsforinvestors.eu/documentivari.php"
     try:
-        response = requests.get(url)
+        response = SESSION.get(url)
         response.raise_for_status()
     except requests.RequestException as e:
         log_message(0, f"Unable to fetch the page: {e}", "ERROR")
         sys.exit(1)
 
-    soup = BeautifulSoup(response.content, 'html.parser')
+    doc = html.fromstring(response.content)
     csv_link = None
 
-    # Cerca in ogni riga TR
-    for tr in soup.find_all('tr'):
-        tds = tr.find_all('td')
-        if len(tds) == 2:
-            if "Rendimenti e durate calcolati End of Day" in tds[0].get_text(strip=True):
-                a_tag = tds[1].find("a", href=True)
-                if a_tag:
-                    csv_link = urljoin(url, a_tag['href'])
-                    break
+    # Cerca la riga TR con la descrizione del file e prende il link nella seconda cella
+    hrefs = doc.xpath(
+        '//tr[count(td) = 2][contains(normalize-space(td[1]), "Rendimenti e durate calcolati End of Day")]'
+        '/td[2]//a/@href'
+    )
+    if hrefs:
+        csv_link = urljoin(url, hrefs[0])
 
     if csv_link:
         try:
             log_message(0, f"Found CSV link: {csv_link}")
-            csv_response = requests.get(csv_link)
-            csv_response.raise_for_status()
-            with open("downloaded.csv", "wb") as f:
-                f.write(csv_response.content)
+            # Ask only for a newer file if we still have the previous download
+            headers = conditional_headers(http_validators, csv_link) if Path(csv_file_path).exists() else {}
+            # Stream the file to disk instead of holding it all in memory
+            with SESSION.get(csv_link, stream=True, headers=headers) as csv_response:
+                csv_response.raise_for_status()
+                if csv_response.status_code == 304:
+                    log_message(0, "CSV file not modified, using previous download", "SUCCESS")
+                    return
+                with open(csv_file_path, "wb") as f:
+                    for chunk in csv_response.iter_content(chunk_size=64 * 1024):
+                        f.write(chunk)
+                remember_http_validators(http_validators, csv_link, csv_response.headers)
             log_message(0, "CSV file successfully downloaded", "SUCCESS")
         except requests.RequestException as e:
             log_message(0, f"Error downloading CSV file: {e}", "ERROR")
@@ -57,6 +150,18 @@ def step0_download_stfi_csv():
         sys.exit(1)
 
 
+def _to_number(text):
+    """
+    Convert CSV text to int or float (decimal comma allowed), raise ValueError otherwise
+    """
+    # int() and float() accept '_' as digit separator, pandas keeps such values as text
+    if '_' in text:
+        raise ValueError(f"not a number: {text!r}")
+    try:
+        return int(text)
+    except ValueError:
+        return float(text.replace(',', '.'))
+
 def step1_csv_to_json(file_path):
     """
     STEP 1: Convert CSV file to JSON
@@ -64,42 +169,59 @@ def step1_csv_to_json(file_path):
     log_message(1, "Starting CSV to JSON conversion")
     
     try:
-        # Try first with ';' separator then with ','
-        try:
-            df = pd.read_csv(file_path, sep=";", decimal=",", on_bad_lines="skip", encoding="utf-8")
-            log_message(1, "CSV successfully read using ';' separator")
-        except Exception:
-            df = pd.read_csv(file_path, sep=",", decimal=",", on_bad_lines="skip", encoding="utf-8")
-            log_message(1, "CSV successfully read using ',' separator")
-        
-        # Remove columns that start with "unnamed"
-        original_cols = len(df.columns)
-        df = df.loc[:, ~df.columns.str.lower().str.startswith('unnamed')]
-        removed_cols = original_cols - len(df.columns)
-        if removed_cols > 0:
-            log_message(1, f"Removed {removed_cols} 'unnamed' columns")
+        with open(file_path, newline='', encoding='utf-8-sig') as f:
+            # Use ';' as separator unless the header is comma separated
+            header = f.readline()
+            sep = ';' if header.count(';') >= header.count(',') else ','
+            f.seek(0)
+            log_message(1, f"Reading CSV using '{sep}' separator")
+            
+            reader = csv.DictReader(f, delimiter=sep)
+            
+            # Skip columns without a name or that start with "unnamed"
+            columns = [col for col in reader.fieldnames if col.strip() and not col.lower().startswith('unnamed')]
+            removed_cols = len(reader.fieldnames) - len(columns)
+            if removed_cols > 0:
+                log_message(1, f"Removed {removed_cols} 'unnamed' columns")
+            
+            # Numeric values of each column, parsed while reading. None once the column has text
+            column_numbers = {col: [] for col in columns}
+            
+            json_data = []
+            for row in reader:
+                # Skip bad lines with more fields than the header
+                if None in row:
+                    continue
+                record = {}
+                for col in columns:
+                    value = row[col]
+                    if value is None or value in NA_VALUES:
+                        value = None
+                    record[col] = value
+                    
+                    numbers = column_numbers[col]
+                    if numbers is not None:
+                        try:
+                            numbers.append(None if value is None else _to_number(value))
+                        except ValueError:
+                            column_numbers[col] = None  # leave column as-is, it contains non-numeric values
+                json_data.append(record)
         
-        # Automatically convert numeric columns
+        # Convert columns whose values are all numeric
         numeric_conversions = 0
-        for col in df.columns:
-            original_dtype = df[col].dtype
-            try:
-                converted_col = pd.to_numeric(df[col])
-            except (ValueError, TypeError):
-                continue  # leave column as-is if it contains non-numeric values
-            df[col] = converted_col
-            if original_dtype != df[col].dtype:
-                numeric_conversions += 1
+        for col, numbers in column_numbers.items():
+            if numbers is None:
+                continue
+            # As with pandas, a column with decimals or missing values is all floats
+            if any(value is None or isinstance(value, float) for value in numbers):
+                numbers = [None if value is None else float(value) for value in numbers]
+            for record, value in zip(json_data, numbers):
+                record[col] = value
+            numeric_conversions += 1
         
         if numeric_conversions > 0:
             log_message(1, f"Converted {numeric_conversions} columns to numeric format")
         
-        # Replace NaN with None
-        df = df.where(pd.notnull(df), None)
-        
-        # Convert to JSON
-        json_data = json.loads(df.to_json(orient="records", force_ascii=False))
-        
         log_message(1, f"Conversion completed: {len(json_data)} records found", "SUCCESS")
         
         # Check if ISIN column exists
@@ -129,54 +251,41 @@ def step2_fetch_isin_bondid_mapping():
     log_message(2, "Starting ISIN-bondId mapping retrieval")
     
     url = "https://www.simpletoolsforinvestors.eu/yieldtable.php?datatype=EOD"
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-    }
     
     try:
         # GET request to the page
         log_message(2, f"Sending request to: {url}")
-        response = requests.get(url, headers=headers)
+        response = SESSION.get(url)
         response.raise_for_status()
         log_message(2, "Page successfully retrieved")
         
         # Parse HTML
-        soup = BeautifulSoup(response.text, 'html.parser')
+        doc = html.fromstring(response.content)
         
         # Find the table
-        table_wrapper = soup.find(id="YieldTable")
-        if not table_wrapper:
+        if not doc.xpath('//*[@id="YieldTable"]'):
             raise ValueError("YieldTable not found")
         
         log_message(2, "YieldTable found, starting parsing")
         
-        # Find all rows
-        rows = table_wrapper.find_all('tr')
+        # Find all rows with data cells
+        rows = doc.xpath('//*[@id="YieldTable"]//tr[td]')
         log_message(2, f"Found {len(rows)} rows in table")
         
         # Dictionary for ISIN -> bondId mapping
         isin_bond_map = {}
         
-        # Regex pattern to extract bondID
-        bond_id_pattern = r'bondID=(\d+)'
-        
         # Process each row
         for row in rows:
-            cells = row.find_all('td')
-            if cells:
-                # First cell contains ISIN
-                isin = cells[0].text.strip()
-                
-                # Look for cell with bondID link
-                for cell in cells:
-                    link = cell.find('a')
-                    if link and 'href' in link.attrs:
-                        href = link['href']
-                        match = re.search(bond_id_pattern, href)
-                        if match:
-                            bond_id = match.group(1)
-                            isin_bond_map[isin] = bond_id
-                            break
+            # First cell contains ISIN
+            isin = row.xpath('string(td[1])').strip()
+            
+            # Look for link with bondID
+            for href in row.xpath('td//a/@href[contains(., "bondID=")]'):
+                match = BOND_ID_RE.search(href)
+                if match:
+                    isin_bond_map[isin] = match.group(1)
+                    break
         
         log_message(2, f"Mapping completed: {len(isin_bond_map)} ISIN-bondId pairs found", "SUCCESS")
         return isin_bond_map
@@ -188,66 +297,215 @@ def step2_fetch_isin_bondid_mapping():
         log_message(2, f"Error processing data: {e}", "ERROR")
         return {}
 
-def step3_get_issue_price(bond_id):
+def parse_retry_after(value):
+    """
+    Return the delay in seconds requested by a Retry-After header (seconds or HTTP date),
+    None if the header is missing or invalid
+    """
+    if not value:
+        return None
+    try:
+        return max(int(value), 0)
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max((retry_at - datetime.now(timezone.utc)).total_seconds(), 0)
+
+class TokenBucket:
+    """
+    Client-side rate limiter: allows `rate` requests per second, with bursts up to `capacity`
+    """
+    def __init__(self, rate, capacity, min_rate):
+        self.rate = rate
+        self.capacity = capacity
+        self.min_rate = min_rate
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.slowed_down_at = None
+        self.lock = asyncio.Lock()
+    
+    async def acquire(self):
+        """
+        Wait until a request can be sent
+        """
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+    
+    def slow_down(self):
+        """
+        Halve the rate after the server rejected a request.
+        Rejections of requests sent at the same time only count once
+        """
+        now = time.monotonic()
+        if self.slowed_down_at is not None and now - self.slowed_down_at < 1:
+            return
+        self.slowed_down_at = now
+        self.rate = max(self.rate / 2, self.min_rate)
+        # Bursts shrink with the rate, and refilling restarts from now
+        self.capacity = max(1, self.rate)
+        self.tokens = 0
+        self.updated = now
+
+def parse_issue_price(content):
+    """
+    Extract the issue price from a bond definition XML, None if missing or invalid
+    """
+    # Fast path: read the tag straight from the raw bytes
+    match = ISSUE_PRICE_RE.search(content)
+    if match:
+        try:
+            # Convert to float, replacing comma with dot if needed
+            return float(match.group(1).replace(b',', b'.'))
+        except ValueError:
+            pass
+    
+    # Fall back to a real XML parser for anything the pattern doesn't handle,
+    # stopping as soon as the tag is found
+    for _, elem in ET.iterparse(BytesIO(content), events=("end",)):
+        # Compare the local name, definitions may use a namespace
+        if elem.tag.rpartition('}')[2] == "issueprice":
+            price_text = elem.text
+            break
+        elem.clear()
+    else:
+        return None
+    if not price_text:
+        return None
+    try:
+        return float(price_text.strip().replace(',', '.'))
+    except ValueError:
+        return None
+
+async def step3_get_issue_price(client, semaphore, rate_limiter, bond_id, http_validators):
     """
     STEP 3: Retrieve issue price for a given bondId
+    Returns None if the bond has no issue price, raises if the request fails
     """
     xml_url = f"https://www.simpletoolsforinvestors.eu/data/definitions/{bond_id}.xml"
     backoff = 60  # seconds, doubles until a maximum
     max_backoff = 600
     
-    while True:
-        try:
-            response = requests.get(xml_url)
-            response.raise_for_status()
-            
-            soup = BeautifulSoup(response.content, "lxml-xml")
-            issue_price_tag = soup.find("issueprice")
-            
-            if issue_price_tag:
-                try:
-                    # Convert to float, replacing comma with dot if needed
-                    price_text = issue_price_tag.text.strip().replace(',', '.')
-                    return float(price_text)
-                except ValueError:
+    async with semaphore:
+        while True:
+            try:
+                await rate_limiter.acquire()
+                response = await client.get(xml_url, headers=conditional_headers(http_validators, xml_url))
+                # Validators are only stored for definitions without an issue price,
+                # so a 304 means the issue price is still missing.
+                # Redirects are followed by the client, any other non-2xx status is an error
+                if response.status_code == 304:
                     return None
-            else:
-                return None        
-        except requests.HTTPError as e:
-            status = getattr(e.response, "status_code", None)
-            if status == 429:
-                print(f"\nToo many requests for bondId {bond_id}. Pausing for {backoff} seconds...")
-                for remaining in range(backoff, 0, -1):
-                    print(f"\rResuming in: {remaining:02d}s", end="")
-                    time.sleep(1)
-                print("\nResuming requests...")
-                backoff = min(backoff * 2, max_backoff)
-                continue
-            else:
-                print(f"\nHTTP {status} while retrieving issue price for bondId {bond_id}")
-                return None
+                response.raise_for_status()
+                
+                issue_price = parse_issue_price(response.content)
+                if issue_price is None:
+                    remember_http_validators(http_validators, xml_url, response.headers)
+                else:
+                    http_validators.pop(xml_url, None)
+                return issue_price
+            except httpx.HTTPStatusError as e:
+                if e.response.status_code == 429:
+                    rate_limiter.slow_down()
+                    # Wait as long as the server asks (up to max_backoff), otherwise back off exponentially.
+                    # Jitter avoids all the waiting requests retrying at the same moment
+                    retry_after = parse_retry_after(e.response.headers.get("Retry-After"))
+                    wait = min(max(retry_after, 1), max_backoff) if retry_after is not None else backoff
+                    wait += random.uniform(0, wait * 0.1)
+                    
+                    # Other requests keep running while this one waits
+                    print()  # end the status line
+                    log_message(3, f"Too many requests for bondId {bond_id}, pausing for {wait:.0f} seconds", "WARNING")
+                    await asyncio.sleep(wait)
+                    if retry_after is None:
+                        backoff = min(backoff * 2, max_backoff)
+                    continue
+                elif e.response.status_code == 404:
+                    # No definition published for this bond
+                    return None
+                raise
+
+async def step3_fetch_issue_prices(bond_ids, http_validators):
+    """
+    STEP 3: Retrieve issue prices concurrently for the given bondIds
+    Returns a dictionary bondId -> issue price, without the bondIds whose request failed
+    """
+    semaphore = asyncio.Semaphore(STEP3_CONCURRENCY)
+    rate_limiter = TokenBucket(STEP3_RATE_LIMIT, STEP3_RATE_LIMIT, STEP3_MIN_RATE_LIMIT)
+    total = len(bond_ids)
+    completed = 0
+    
+    issue_prices = {}
+    
+    async def fetch(bond_id):
+        nonlocal completed
+        try:
+            issue_prices[bond_id] = await step3_get_issue_price(client, semaphore, rate_limiter, bond_id, http_validators)
+        except httpx.HTTPStatusError as e:
+            print(f"\nHTTP {e.response.status_code} while retrieving issue price for bondId {bond_id}")
         except Exception as e:
             print(f"\nError while retrieving issue price for bondId {bond_id}: {str(e)}")
-            return None    
-        # except Exception as e:
-        #     if e.response.status_code == 429:  # Too Many Requests
-        #         pause_minutes = 5
-        #         print(f"\nToo many requests for bondId {bond_id}. Pausing for {pause_minutes} minutes...")
-                
-        #         # Show countdown
-        #         for remaining in range(pause_minutes * 60, 0, -1):
-        #             minutes = remaining // 60
-        #             seconds = remaining % 60
-        #             print(f"\rResuming in: {minutes:02d}:{seconds:02d}", end="")
-        #             time.sleep(1)
-                
-        #         print("\nRiprendo le richieste...")
-        #         continue  # Riprova dopo la pausa
-                
-        #     print(f"\nHTTP Error while retrieving issue price for bondId {bond_id}: {str(e)}")
-        #     return None
+        completed += 1
+        print(f"\rRetrieved issue price for bondId {bond_id} - {completed}/{total}", end="")
+    
+    # With HTTP/2 all requests are multiplexed over a single connection,
+    # the connection limit only matters if the server falls back to HTTP/1.1
+    limits = httpx.Limits(max_connections=STEP3_CONCURRENCY, max_keepalive_connections=STEP3_CONCURRENCY)
+    async with httpx.AsyncClient(http2=True, headers=HEADERS, limits=limits, timeout=30.0, follow_redirects=True) as client:
+        await asyncio.gather(*(fetch(bond_id) for bond_id in bond_ids))
+    
+    return issue_prices
+
+def open_issue_price_cache(file_path):
+    """
+    Open (creating it if needed) the issue price cache
+    """
+    conn = sqlite3.connect(file_path)
+    with conn:
+        conn.execute("CREATE TABLE IF NOT EXISTS ip(bondid TEXT PRIMARY KEY, price REAL, ts INTEGER)")
+    return conn
+
+def load_cached_issue_prices(conn, bond_ids):
+    """
+    Return bondId -> issue price for the bondIds found in the cache.
+    Missing prices older than MISSING_PRICE_CACHE_TTL are ignored so they get fetched again
+    """
+    min_ts = int(time.time()) - MISSING_PRICE_CACHE_TTL
+    bond_ids = list(bond_ids)
+    cached = {}
+    # Look up by primary key, in batches to stay below SQLite's parameter limit
+    for start in range(0, len(bond_ids), 500):
+        batch = bond_ids[start:start + 500]
+        query = (
+            f"SELECT bondid, price FROM ip WHERE bondid IN ({','.join('?' * len(batch))})"
+            " AND (price IS NOT NULL OR ts >= ?)"
+        )
+        cached.update(conn.execute(query, (*batch, min_ts)))
+    return cached
+
+def save_issue_prices_to_cache(conn, issue_prices):
+    """
+    Store bondId -> issue price in the cache
+    """
+    ts = int(time.time())
+    with conn:
+        conn.executemany(
+            "INSERT OR REPLACE INTO ip(bondid, price, ts) VALUES (?, ?, ?)",
+            [(bond_id, price, ts) for bond_id, price in issue_prices.items()]
+        )
 
-def step3_enrich_with_issue_prices(json_data, isin_bond_map):
+def step3_enrich_with_issue_prices(json_data, isin_bond_map, http_validators):
     """
     STEP 3: Enrich JSON with issue prices
     """
@@ -278,10 +536,44 @@ def step3_enrich_with_issue_prices(json_data, isin_bond_map):
         price_found = 0
         price_not_found = 0
         
-        # Enrich each record
+        # Collect the bondIds to look up, skipping records that already have a valid issue price.
+        # A bondId shared by several ISINs is only looked up once
+        bond_ids = set()
         for i, record in enumerate(json_data):
             isin = record.get(isin_column)
             
+            if 'issueprice' in record and record['issueprice'] is not None:
+                continue
+            
+            if isin and isin in isin_bond_map:
+                bond_ids.add(isin_bond_map[isin])
+            elif isin:
+                log_message(3, f"BondId not found for ISIN: {isin} - Record {i+1}/{total_records}", "WARNING")
+        
+        conn = open_issue_price_cache(ISSUE_PRICE_CACHE_PATH)
+        try:
+            # Use cached issue prices where possible
+            issue_prices = load_cached_issue_prices(conn, bond_ids)
+            bond_ids -= issue_prices.keys()
+            log_message(3, f"Issue prices found in cache: {len(issue_prices)}")
+            
+            # Retrieve the remaining issue prices concurrently
+            if bond_ids:
+                log_message(3, f"Retrieving {len(bond_ids)} issue prices ({STEP3_CONCURRENCY} concurrent requests)")
+                fetched_prices = asyncio.run(step3_fetch_issue_prices(sorted(bond_ids), http_validators))
+                
+                # New line after status line
+                print()
+                
+                save_issue_prices_to_cache(conn, fetched_prices)
+                issue_prices.update(fetched_prices)
+        finally:
+            conn.close()
+        
+        # Enrich each record
+        for record in json_data:
+            isin = record.get(isin_column)
+            
             # Skip if the record already has a valid issue price
             if 'issueprice' in record and record['issueprice'] is not None:
                 price_found += 1
@@ -293,10 +585,7 @@ def step3_enrich_with_issue_prices(json_data, isin_bond_map):
                 record['bondid'] = bond_id
                 bondid_added += 1
                 
-                # Retrieve issue price
-                print(f"\rRetrieving issue price for ISIN {isin} (bondId: {bond_id}) - Record {i+1}/{total_records}", end="")
-                issue_price = step3_get_issue_price(bond_id)
-                
+                issue_price = issue_prices.get(bond_id)
                 if issue_price:
                     record['issueprice'] = issue_price
                     price_found += 1
@@ -306,11 +595,6 @@ def step3_enrich_with_issue_prices(json_data, isin_bond_map):
             else:
                 record['bondid'] = None
                 record['issueprice'] = None
-                if isin:
-                    log_message(3, f"BondId not found for ISIN: {isin} - Record {i+1}/{total_records}", "WARNING")
-        
-        # New line after status line
-        print()
         
         # Final report
         log_message(3, f"Enrichment completed:", "SUCCESS")
@@ -326,34 +610,50 @@ def load_existing_json(file_path):
     Load existing JSON if present, otherwise return None
     """
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    except (FileNotFoundError, json.JSONDecodeError):
+        with open(file_path, 'rb') as f:
+            return orjson.loads(f.read())
+    except (FileNotFoundError, orjson.JSONDecodeError):
         return None
 
-def merge_data(existing_data, new_data, isin_column):
+def save_json_records(file_path, records):
+    """
+    Save records as an indented JSON array, encoding one record at a time
+    (same output as json.dump with indent=2)
+    """
+    with open(file_path, 'wb') as f:
+        if not records:
+            f.write(b"[]")
+            return
+        f.write(b"[\n  ")
+        for i, record in enumerate(records):
+            if i > 0:
+                f.write(b",\n  ")
+            # Newlines only occur between tokens, so this nests the record one level deeper
+            f.write(orjson.dumps(record, option=orjson.OPT_INDENT_2).replace(b"\n", b"\n  "))
+        f.write(b"\n]")
+
+def merge_data(existing_by_isin, new_data, isin_column):
     """
     Merge existing data with new data:
     - Keep static data (bondid, issueprice) from existing records if available
     - Use all other fields from new data (prices, yields, etc.)
+    Existing records are given as a dictionary ISIN -> record, new records are updated in place
     """
-    if not existing_data:
+    if not existing_by_isin:
         return new_data
-        
-    # Create a dictionary of existing data using ISIN as key
-    existing_dict = {record[isin_column]: record for record in existing_data}
     
     # List of fields that are static (don't change over time)
     static_fields = ['bondid', 'issueprice']
     
     # Update or add new records
     for new_record in new_data:
-        isin = new_record[isin_column]
-        if isin in existing_dict:
+        existing_record = existing_by_isin.get(new_record[isin_column])
+        if existing_record is not None:
             # Keep static fields from existing record if they exist and are not null
             for field in static_fields:
-                if field in existing_dict[isin] and existing_dict[isin][field] is not None:
-                    new_record[field] = existing_dict[isin][field]
+                value = existing_record.get(field)
+                if value is not None:
+                    new_record[field] = value
     
     return new_data
 
@@ -381,12 +681,8 @@ def main():
     print("\n" + "-" * 80)
     print("STEP 0: DOWNLOADING CSV FROM STFI")
     print("-" * 80)
-    step0_download_stfi_csv()
-    
-    # Load existing data for potential merge
-    existing_data = load_existing_json(output_file_path)
-    if existing_data:
-        log_message(0, f"Loaded {len(existing_data)} records from existing JSON file")
+    http_validators = load_http_validators(HTTP_VALIDATORS_PATH)
+    step0_download_stfi_csv(csv_file_path, http_validators)
     
     # STEP 1: CSV to JSON
     print("\n" + "-" * 80)
@@ -413,21 +709,22 @@ def main():
     # Merge with existing data to preserve static fields
     if existing_data:
         log_message(0, "Merging existing static data with new CSV data")
-        json_data = merge_data(existing_data, json_data, isin_column)
+        existing_by_isin = {record[isin_column]: record for record in existing_data}
+        json_data = merge_data(existing_by_isin, json_data, isin_column)
     
     # STEP 2: Retrieve ISIN-bondId mapping only for records that need it
     print("\n" + "-" * 80)
     print("STEP 2: RETRIEVING ISIN-BONDID MAPPING")
     print("-" * 80)
     
-    # Filter ISINs that need enrichment
-    isin_to_process = set()
-    for record in json_data:
-        if ('bondid' not in record or record['bondid'] is None or 
-            'issueprice' not in record or record['issueprice'] is None):
-            isin_to_process.add(record[isin_column])
+    # Filter only records that need enrichment
+    records_to_process = [
+        record for record in json_data
+        if record.get('bondid') is None or record.get('issueprice') is None
+    ]
     
-    if isin_to_process:
+    if records_to_process:
+        isin_to_process = {record[isin_column] for record in records_to_process}
         log_message(2, f"Need to retrieve information for {len(isin_to_process)} ISINs")
         isin_bond_map = step2_fetch_isin_bondid_mapping()
     else:
@@ -442,28 +739,15 @@ def main():
     print("STEP 3: ENRICHING WITH ISSUE PRICES")
     print("-" * 80)
     
-    # Filter only records that need enrichment
-    records_to_process = [
-        record for record in json_data 
-        if ('bondid' not in record or record['bondid'] is None or 
-            'issueprice' not in record or record['issueprice'] is None)
-    ]
-    
     if records_to_process:
         log_message(3, f"Processing {len(records_to_process)} records that need enrichment")
-        enriched_subset = step3_enrich_with_issue_prices(records_to_process, isin_bond_map)
-        
-        # Update original records with new data
-        enriched_dict = {record[isin_column]: record for record in enriched_subset}
-        for record in json_data:
-            isin = record[isin_column]
-            if isin in enriched_dict:
-                record.update(enriched_dict[isin])
-        
-        enriched_json = json_data
+        # Records are enriched in place, so json_data is updated as well
+        step3_enrich_with_issue_prices(records_to_process, isin_bond_map, http_validators)
     else:
         log_message(3, "No records need enrichment")
-        enriched_json = json_data
+    enriched_json = json_data
+    
+    save_http_validators(HTTP_VALIDATORS_PATH, http_validators)
     
     # Save final result
     print("\n" + "-" * 80)
@@ -471,8 +755,7 @@ def main():
     print("-" * 80)
     
     try:
-        with open(output_file_path, 'w', encoding='utf-8') as f:
-            json.dump(enriched_json, f, ensure_ascii=False, indent=2)
+        save_json_records(output_file_path, enriched_json)
         log_message(0, f"Final JSON file saved to: {output_file_path}", "SUCCESS")
         
         # Final statistics